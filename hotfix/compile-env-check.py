@@ -5,18 +5,63 @@ RT-Thread编译环境专业检查工具
 """
 
 import subprocess
-import shutil
-import platform
 import os
 import sys
 import time
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Union
-import argparse
-import json
 import re
+import hashlib
 from dataclasses import dataclass, asdict, field
 from enum import Enum
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib.util import find_spec
+
+
+# 版本号匹配模式（模块级预编译，直接匹配子进程输出的原始字节）
+# x.y 与可选的 .z 合并为一个模式，一次扫描同时找出 x.y.z 和 x.y 候选
+_VERSION_RE = re.compile(rb'\b(\d+\.\d+)(\.\d+)?\b')
+_PIP_RE = re.compile(rb'pip\s+(\d+\.\d+\.\d+)')
+
+# /etc/os-release 字段匹配模式
+_OS_RELEASE_ID_RE = re.compile(r'^ID=(.*)$', re.MULTILINE)
+_OS_RELEASE_NAME_RE = re.compile(r'^NAME=(.*)$', re.MULTILINE)
+
+# 版本号只在输出开头查找，无需扫描完整的版本横幅
+_VERSION_SCAN_BYTES = 512
+
+# 值对象使用__slots__去掉实例__dict__（slots参数需要Python 3.10+）
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# 安装命令对应的发行版ID，ToolInfo.install_cmd按此顺序给出各发行版的命令
+_INSTALL_KEYS = ("debian", "rhel", "arch", "opensuse")
+_INSTALL_INDEX = {distro_id: index for index, distro_id in enumerate(_INSTALL_KEYS)}
+
+# CheckResult序列化为JSON时的字段顺序
+_JSON_FIELDS = ("tool_name", "description", "status", "version", "path", "message", "error")
+
+# 检查状态对应的符号
+_STATUS_SYMBOLS = {
+    "通过": "✅",
+    "失败": "❌",
+    "警告": "⚠️",
+    "可选": "🔧"
+}
+
+
+def _dumps_json(obj) -> bytes:
+    """
+    序列化为缩进的UTF-8 JSON，orjson可用时优先使用
+
+    CheckResult可直接放入obj：orjson原生序列化数据类和枚举，
+    标准库json通过default回调处理，无需事先调用to_dict
+    """
+    try:
+        import orjson
+    except ImportError:
+        import json
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
 
 
 class CheckStatus(Enum):
@@ -32,16 +77,10 @@ class CheckStatus(Enum):
 
     def get_symbol(self):
         """获取对应的符号"""
-        symbols = {
-            "通过": "✅",
-            "失败": "❌",
-            "警告": "⚠️",
-            "可选": "🔧"
-        }
-        return symbols.get(self.value, self.value)
+        return _STATUS_SYMBOLS.get(self.value, self.value)
 
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class ToolInfo:
     """工具信息"""
     name: str
@@ -49,12 +88,19 @@ class ToolInfo:
     required: bool
     min_version: Optional[str] = None
     max_version: Optional[str] = None
-    install_cmd: Optional[Dict[str, str]] = None
+    install_cmd: Optional[Tuple[str, ...]] = None  # 与_INSTALL_KEYS顺序对应
     version_args: Optional[List[str]] = None
     test_cmd: Optional[List[str]] = None
 
+    def get_install_cmd(self, distro_id: str) -> Optional[str]:
+        """获取指定发行版的安装命令"""
+        index = _INSTALL_INDEX.get(distro_id)
+        if index is None or not self.install_cmd:
+            return None
+        return self.install_cmd[index]
 
-@dataclass
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class CheckResult:
     """检查结果"""
     tool_name: str
@@ -67,15 +113,16 @@ class CheckResult:
 
     def to_dict(self):
         """转换为字典，确保枚举被正确序列化"""
-        return {
-            "tool_name": self.tool_name,
-            "description": self.description,
-            "status": str(self.status),  # 转换为字符串
-            "version": self.version,
-            "path": self.path,
-            "message": self.message,
-            "error": self.error
-        }
+        result = {name: getattr(self, name) for name in _JSON_FIELDS}
+        result["status"] = str(self.status)  # 转换为字符串
+        return result
+
+
+def _json_default(obj):
+    """标准库json的default回调，序列化CheckResult"""
+    if isinstance(obj, CheckResult):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 class RTTEnvironmentChecker:
@@ -84,6 +131,10 @@ class RTTEnvironmentChecker:
     # 超时配置
     TIMEOUT = 10  # 秒
 
+    # 命令结果缓存配置
+    CACHE_SUBDIR = Path(".cache") / "rt-env-check"  # 相对于用户主目录，运行时才解析
+    CACHE_TTL = 300  # 秒
+
     # 必要工具链
     REQUIRED_TOOLS = {
         "python3": ToolInfo(
@@ -92,12 +143,12 @@ class RTTEnvironmentChecker:
             required=True,
             min_version="3.8",
             version_args=["--version"],
-            install_cmd={
-                "debian": "apt install python3 python3-pip",
-                "rhel": "dnf install python3 python3-pip",
-                "arch": "pacman -S python python-pip",
-                "opensuse": "zypper install python3 python3-pip"
-            }
+            install_cmd=(
+                "apt install python3 python3-pip",
+                "dnf install python3 python3-pip",
+                "pacman -S python python-pip",
+                "zypper install python3 python3-pip",
+            )
         ),
         "scons": ToolInfo(
             name="scons",
@@ -105,12 +156,12 @@ class RTTEnvironmentChecker:
             required=True,
             min_version="4.0.0",
             version_args=["--version"],
-            install_cmd={
-                "debian": "pip3 install scons",
-                "rhel": "pip3 install scons",
-                "arch": "pip install scons",
-                "opensuse": "pip3 install scons"
-            }
+            install_cmd=(
+                "pip3 install scons",
+                "pip3 install scons",
+                "pip install scons",
+                "pip3 install scons",
+            )
         ),
         "arm-none-eabi-gcc": ToolInfo(
             name="arm-none-eabi-gcc",
@@ -118,12 +169,12 @@ class RTTEnvironmentChecker:
             required=True,
             min_version="10.3.0",
             version_args=["--version"],
-            install_cmd={
-                "debian": "apt install gcc-arm-none-eabi",
-                "rhel": "dnf install arm-none-eabi-gcc-cs",
-                "arch": "pacman -S arm-none-eabi-gcc",
-                "opensuse": "zypper install cross-arm-none-eabi-gcc"
-            }
+            install_cmd=(
+                "apt install gcc-arm-none-eabi",
+                "dnf install arm-none-eabi-gcc-cs",
+                "pacman -S arm-none-eabi-gcc",
+                "zypper install cross-arm-none-eabi-gcc",
+            )
         ),
         "arm-none-eabi-objcopy": ToolInfo(
             name="arm-none-eabi-objcopy",
@@ -149,12 +200,12 @@ class RTTEnvironmentChecker:
             required=False,
             min_version="10.1",
             version_args=["--version"],
-            install_cmd={
-                "debian": "apt install gdb-multiarch",
-                "rhel": "dnf install gdb-gdbserver",
-                "arch": "pacman -S arm-none-eabi-gdb",
-                "opensuse": "zypper install gdb"
-            }
+            install_cmd=(
+                "apt install gdb-multiarch",
+                "dnf install gdb-gdbserver",
+                "pacman -S arm-none-eabi-gdb",
+                "zypper install gdb",
+            )
         ),
         "openocd": ToolInfo(
             name="openocd",
@@ -162,43 +213,139 @@ class RTTEnvironmentChecker:
             required=False,
             min_version="0.11.0",
             version_args=["-v"],  # OpenOCD使用-v参数获取版本
-            install_cmd={
-                "debian": "apt install openocd",
-                "rhel": "dnf install openocd",
-                "arch": "pacman -S openocd",
-                "opensuse": "zypper install openocd"
-            }
+            install_cmd=(
+                "apt install openocd",
+                "dnf install openocd",
+                "pacman -S openocd",
+                "zypper install openocd",
+            )
         ),
         "picocom": ToolInfo(
             name="picocom",
             description="串口终端",
             required=False,
             version_args=["--version"],
-            install_cmd={
-                "debian": "apt install picocom",
-                "rhel": "dnf install picocom",
-                "arch": "pacman -S picocom",
-                "opensuse": "zypper install picocom"
-            }
+            install_cmd=(
+                "apt install picocom",
+                "dnf install picocom",
+                "pacman -S picocom",
+                "zypper install picocom",
+            )
         ),
     }
 
-    def __init__(self, verbose: bool = True, timeout: int = 10):
+    def __init__(self, verbose: bool = True, timeout: int = 10, use_cache: bool = True):
         self.verbose = verbose
         self.timeout = timeout
+        self.cache_dir = self._init_cache_dir() if use_cache else None
         self.results: List[CheckResult] = []
+        self._by_status: Dict[CheckStatus, List[CheckResult]] = {status: [] for status in CheckStatus}
         self.distro_info = self._detect_distro()
         self.path_dirs = os.environ.get('PATH', '').split(':')
+        # 规范化后的PATH集合，用于O(1)成员判断
+        self._path_set = frozenset(os.path.normpath(p) for p in self.path_dirs if p)
+        self._path_index = self._build_path_index()
         self.packaging_available = self._check_packaging_module()
         self.script_dir = Path.cwd()
 
-    def _check_packaging_module(self) -> bool:
-        """检查packaging模块是否可用"""
+    def _init_cache_dir(self) -> Optional[Path]:
+        """创建命令结果缓存目录并清理过期条目，无法确定主目录或创建失败时禁用缓存"""
+        try:
+            cache_dir = Path.home() / self.CACHE_SUBDIR
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        except (OSError, RuntimeError):
+            return None
+        self._purge_stale_cache(cache_dir)
+        return cache_dir
+
+    def _purge_stale_cache(self, cache_dir: Path):
+        """删除过期的缓存文件（工具升级后旧键不会再被读取，需在此清理）"""
+        deadline = time.time() - self.CACHE_TTL
+        try:
+            with os.scandir(cache_dir) as subdirs:
+                for subdir in subdirs:
+                    if not subdir.is_dir(follow_symlinks=False):
+                        continue
+                    with os.scandir(subdir.path) as entries:
+                        for entry in entries:
+                            if entry.stat(follow_symlinks=False).st_mtime < deadline:
+                                os.unlink(entry.path)
+        except OSError:
+            pass
+
+    def _cache_file(self, cmd: List[str]) -> Optional[Path]:
+        """根据 (可执行文件, mtime, 命令行) 计算缓存文件路径，无法stat时返回None"""
+        if self.cache_dir is None:
+            return None
         try:
-            from packaging import version
-            return True
-        except ImportError:
-            return False
+            mtime_ns = os.stat(cmd[0]).st_mtime_ns
+        except OSError:
+            return None
+        # v2: 二进制缓存格式，与旧的JSON缓存文件区分开
+        key = hashlib.sha1(f"v2|{cmd[0]}|{mtime_ns}|{' '.join(cmd)}".encode()).hexdigest()
+        return self.cache_dir / key[:2] / key
+
+    def _load_cached(self, cache_file: Path) -> Optional[Tuple[bool, bytes, str]]:
+        """读取未过期的缓存结果（格式见_store_cached）"""
+        try:
+            if time.time() - cache_file.stat().st_mtime > self.CACHE_TTL:
+                cache_file.unlink()
+                return None
+            data = cache_file.read_bytes()
+        except OSError:
+            return None
+        if len(data) < 5 or data[:1] not in (b"0", b"1"):
+            return None
+        stderr_end = 5 + int.from_bytes(data[1:5], "big")
+        if stderr_end > len(data):
+            return None
+        stderr = data[5:stderr_end].decode('utf-8', errors='surrogateescape')
+        return (data[:1] == b"1", data[stderr_end:], stderr)
+
+    def _store_cached(self, cache_file: Path, result: Tuple[bool, bytes, str]):
+        """
+        写入缓存结果（先写临时文件再替换，避免并发读到半截内容）
+        格式：成功标志(b"0"/b"1") + stderr长度(4字节大端) + stderr + stdout原始字节
+        """
+        success, stdout, stderr = result
+        stderr_bytes = stderr.encode('utf-8', errors='surrogateescape')
+        try:
+            cache_file.parent.mkdir(exist_ok=True)
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'wb') as f:
+                f.write(b"1" if success else b"0")
+                f.write(len(stderr_bytes).to_bytes(4, "big"))
+                f.write(stderr_bytes)
+                f.write(stdout)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+
+    def _build_path_index(self) -> Dict[str, str]:
+        """
+        扫描一次PATH目录，为要检查的工具建立 {文件名: 完整路径} 索引（前面的目录优先）
+        与shutil.which一致，只记录可执行文件，前面目录中的不可执行同名文件不会遮蔽后面的工具
+        """
+        # 先按文件名过滤，只对要检查的工具名调用stat/access
+        wanted = self.REQUIRED_TOOLS.keys() | self.OPTIONAL_TOOLS.keys() | {"pip3"}
+        path_index = {}
+        for path_dir in self.path_dirs:
+            if not path_dir:
+                continue
+            try:
+                with os.scandir(path_dir) as entries:
+                    for entry in entries:
+                        if (entry.name in wanted and entry.name not in path_index
+                                and entry.is_file() and os.access(entry.path, os.X_OK)):
+                            path_index[entry.name] = entry.path
+            except OSError:
+                # 目录不存在或无权限读取，跳过
+                continue
+        return path_index
+
+    def _check_packaging_module(self) -> bool:
+        """检查packaging模块是否可用（只查找模块，不在启动时导入）"""
+        return find_spec("packaging") is not None
 
     def _detect_distro(self) -> Dict[str, str]:
         """检测Linux发行版"""
@@ -208,106 +355,111 @@ class RTTEnvironmentChecker:
         os_release_path = Path("/etc/os-release")
         if os_release_path.exists():
             try:
-                with open(os_release_path, 'r') as f:
-                    for line in f:
-                        if line.startswith("ID="):
-                            distro_info["id"] = line.strip().split('=', 1)[1].strip('"\'')
-                        elif line.startswith("NAME="):
-                            distro_info["name"] = line.strip().split('=', 1)[1].strip('"\'')
+                text = os_release_path.read_text()
+                id_match = _OS_RELEASE_ID_RE.search(text)
+                name_match = _OS_RELEASE_NAME_RE.search(text)
+                if id_match:
+                    distro_info["id"] = id_match.group(1).strip().strip('"\'')
+                if name_match:
+                    distro_info["name"] = name_match.group(1).strip().strip('"\'')
             except (IOError, PermissionError) as e:
                 if self.verbose:
                     print(f"警告: 无法读取/etc/os-release: {e}")
 
         return distro_info
 
-    def _run_command(self, cmd: List[str], capture_output: bool = True) -> Tuple[bool, str, str]:
+    def _run_command(self, cmd: List[str], capture_output: bool = True) -> Tuple[bool, bytes, str]:
         """
         安全运行命令，带超时和异常处理
 
+        stdout保持原始字节，仅stderr解码用于错误信息
         返回: (success, stdout, stderr)
         """
+        cache_file = self._cache_file(cmd) if capture_output else None
+        if cache_file is not None:
+            cached = self._load_cached(cache_file)
+            if cached is not None:
+                return cached
+
         try:
             result = subprocess.run(
                 cmd,
                 stdout=subprocess.PIPE if capture_output else None,
                 stderr=subprocess.PIPE if capture_output else None,
-                text=True,
                 timeout=self.timeout,
                 check=False
             )
 
-            stdout = result.stdout if result.stdout else ""
-            stderr = result.stderr if result.stderr else ""
+            stdout = result.stdout if result.stdout else b""
+            stderr = result.stderr.decode('utf-8', errors='replace') if result.stderr else ""
 
-            return (result.returncode == 0, stdout, stderr)
+            output = (result.returncode == 0, stdout, stderr)
+            if cache_file is not None:
+                self._store_cached(cache_file, output)
+            return output
 
         except subprocess.TimeoutExpired:
-            return (False, "", f"命令执行超时 ({self.timeout}秒)")
+            return (False, b"", f"命令执行超时 ({self.timeout}秒)")
         except FileNotFoundError:
-            return (False, "", "命令未找到")
+            return (False, b"", "命令未找到")
         except PermissionError:
-            return (False, "", "权限不足")
+            return (False, b"", "权限不足")
         except Exception as e:
-            return (False, "", f"执行错误: {str(e)}")
+            return (False, b"", f"执行错误: {str(e)}")
 
-    def _get_tool_version(self, tool_name: str, version_args: List[str] = None) -> Tuple[bool, Optional[str], str]:
+    def _get_tool_version(self, tool_name: str, version_args: List[str] = None,
+                          tool_path: Optional[str] = None) -> Tuple[bool, Optional[str], str]:
         """
         获取工具版本，带完整异常处理
 
+        tool_path: 已解析的可执行文件绝对路径，提供时直接执行，避免再次搜索PATH
+
         返回: (success, version, error)
         """
         if version_args is None:
             version_args = ["--version"]
 
-        cmd = [tool_name] + version_args
+        cmd = [tool_path or tool_name] + version_args
         success, stdout, stderr = self._run_command(cmd)
 
         if not success:
             return (False, None, stderr)
 
-        # 从输出中提取版本号
+        # 从输出中提取版本号，只解码匹配到的部分
         if stdout:
-            # 查找版本号模式 x.y.z
-            version_pattern = r'\b\d+\.\d+\.\d+\b'
-            match = re.search(version_pattern, stdout)
-            if match:
-                return (True, match.group(0), "")
-
-            # 查找版本号模式 x.y
-            version_pattern = r'\b\d+\.\d+\b'
-            match = re.search(version_pattern, stdout)
-            if match:
-                return (True, match.group(0), "")
+            # 优先返回第一个 x.y.z，没有时退回第一个 x.y
+            first_short = None
+            for match in _VERSION_RE.finditer(stdout[:_VERSION_SCAN_BYTES]):
+                if match.group(2):
+                    return (True, match.group(0).decode('ascii'), "")
+                if first_short is None:
+                    first_short = match.group(0)
+            if first_short is not None:
+                return (True, first_short.decode('ascii'), "")
 
         return (True, "unknown", "无法提取版本号")
 
+    def _missing_tool_result(self, tool_info: ToolInfo) -> CheckResult:
+        """PATH中未找到工具时的检查结果"""
+        return CheckResult(
+            tool_name=tool_info.name,
+            description=tool_info.description,
+            status=CheckStatus.FAIL if tool_info.required else CheckStatus.WARNING,
+            message="未安装",
+            error=f"在PATH中未找到 {tool_info.name}"
+        )
+
     def _check_tool(self, tool_info: ToolInfo) -> CheckResult:
         """检查单个工具"""
-        tool_path = shutil.which(tool_info.name)
+        tool_path = self._path_index.get(tool_info.name)
 
+        # 索引中只有可执行文件，无需再检查执行权限
         if not tool_path:
-            return CheckResult(
-                tool_name=tool_info.name,
-                description=tool_info.description,
-                status=CheckStatus.FAIL if tool_info.required else CheckStatus.WARNING,
-                message="未安装",
-                error=f"在PATH中未找到 {tool_info.name}"
-            )
-
-        # 检查工具是否可执行
-        if not os.access(tool_path, os.X_OK):
-            return CheckResult(
-                tool_name=tool_info.name,
-                description=tool_info.description,
-                status=CheckStatus.FAIL if tool_info.required else CheckStatus.WARNING,
-                path=tool_path,
-                message="无执行权限",
-                error=f"文件 {tool_path} 无执行权限"
-            )
+            return self._missing_tool_result(tool_info)
 
         # 获取版本
         version_args = tool_info.version_args
-        success, version, error = self._get_tool_version(tool_info.name, version_args)
+        success, version, error = self._get_tool_version(tool_info.name, version_args, tool_path)
 
         if not success:
             return CheckResult(
@@ -353,12 +505,23 @@ class RTTEnvironmentChecker:
 
     def _check_pip_availability(self) -> CheckResult:
         """检查pip3是否可用"""
-        success, stdout, stderr = self._run_command(["pip3", "--version"])
+        pip_path = self._path_index.get("pip3")
+        if not pip_path:
+            # PATH中不存在pip3，无需启动子进程
+            return CheckResult(
+                tool_name="pip3",
+                description="Python包管理器",
+                status=CheckStatus.WARNING,
+                message="未安装，将无法通过pip安装Python包",
+                error="在PATH中未找到 pip3"
+            )
+
+        success, stdout, stderr = self._run_command([pip_path, "--version"])
 
         if success:
             # 提取pip版本
-            version_match = re.search(r'pip\s+(\d+\.\d+\.\d+)', stdout)
-            version = version_match.group(1) if version_match else "unknown"
+            version_match = _PIP_RE.search(stdout[:_VERSION_SCAN_BYTES])
+            version = version_match.group(1).decode('ascii') if version_match else "unknown"
 
             return CheckResult(
                 tool_name="pip3",
@@ -392,15 +555,14 @@ class RTTEnvironmentChecker:
 
         missing_paths = []
         for path in common_toolchain_paths:
-            if os.path.isdir(path) and path not in self.path_dirs:
+            if os.path.isdir(path) and os.path.normpath(path) not in self._path_set:
                 missing_paths.append(path)
 
         if missing_paths:
-            # 去重并限制显示数量
-            unique_paths = list(dict.fromkeys(missing_paths))
-            paths_display = ", ".join(unique_paths[:3])
-            if len(unique_paths) > 3:
-                paths_display += f" 等 {len(unique_paths)} 个路径"
+            # 限制显示数量（common_toolchain_paths各项互不相同，无需去重）
+            paths_display = ", ".join(missing_paths[:3])
+            if len(missing_paths) > 3:
+                paths_display += f" 等 {len(missing_paths)} 个路径"
 
             results.append(CheckResult(
                 tool_name="PATH",
@@ -416,6 +578,7 @@ class RTTEnvironmentChecker:
         self.results = []
 
         if self.verbose:
+            import platform
             print(f"🔍 检查RT-Thread Linux编译环境")
             print(f"   系统: {self.distro_info['name']} ({self.distro_info['id']})")
             print(f"   Python: {platform.python_version()}")
@@ -424,24 +587,35 @@ class RTTEnvironmentChecker:
                 print(f"   可选安装: pip3 install packaging")
             print("=" * 60)
 
-        # 检查必要工具
-        for tool_name, tool_info in self.REQUIRED_TOOLS.items():
-            result = self._check_tool(tool_info)
-            self.results.append(result)
-
-        # 检查可选工具
-        for tool_name, tool_info in self.OPTIONAL_TOOLS.items():
-            result = self._check_tool(tool_info)
-            self.results.append(result)
-
-        # 检查pip
-        pip_result = self._check_pip_availability()
-        self.results.append(pip_result)
+        # 并发检查必要工具、可选工具和pip（均为独立的子进程调用）
+        # 线程在等待子进程时释放GIL，超时由subprocess.run负责终止子进程，
+        # 因此无需改用asyncio子进程
+        tool_infos = list(self.REQUIRED_TOOLS.values()) + list(self.OPTIONAL_TOOLS.values())
+        # PATH索引中不存在的工具直接生成结果，不再进入线程池
+        present_count = sum(1 for tool_info in tool_infos if tool_info.name in self._path_index)
+        with ThreadPoolExecutor(max_workers=present_count + 1) as executor:
+            checks = []
+            for tool_info in tool_infos:
+                if tool_info.name in self._path_index:
+                    checks.append(executor.submit(self._check_tool, tool_info))
+                else:
+                    checks.append(self._missing_tool_result(tool_info))
+            checks.append(executor.submit(self._check_pip_availability))
+            # 按提交顺序收集结果，保持输出顺序不变
+            self.results.extend(
+                check.result() if isinstance(check, Future) else check
+                for check in checks
+            )
 
         # 检查PATH
         path_results = self._check_path_environment()
         self.results.extend(path_results)
 
+        # 按状态分组，供摘要和建议复用，避免重复遍历
+        self._by_status = {status: [] for status in CheckStatus}
+        for result in self.results:
+            self._by_status[result.status].append(result)
+
         return self.results
 
     def print_results(self):
@@ -449,11 +623,13 @@ class RTTEnvironmentChecker:
         if not self.results:
             return
 
-        print("\n检查结果:")
-        print("-" * 80)
+        # 先拼接完整输出，再一次性写出
+        lines = []
+        lines.append("\n检查结果:")
+        lines.append("-" * 80)
         # 调整列宽，状态列使用4个字符宽度
-        print(f"{'工具名称':<20} {'状态':<6} {'版本':<15} {'说明':<30}")
-        print("-" * 80)
+        lines.append(f"{'工具名称':<20} {'状态':<6} {'版本':<15} {'说明':<30}")
+        lines.append("-" * 80)
 
         for result in self.results:
             version = result.version if result.version else ""
@@ -461,9 +637,10 @@ class RTTEnvironmentChecker:
 
             # 显示文字状态，不显示符号
             status_text = str(result.status)
-            print(f"{result.description:<20} {status_text:<6} {version:<15} {message:<30}")
+            lines.append(f"{result.description:<20} {status_text:<6} {version:<15} {message:<30}")
 
-        print("-" * 80)
+        lines.append("-" * 80)
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def get_install_commands(self) -> Dict[str, List[str]]:
         """获取安装命令"""
@@ -474,19 +651,18 @@ class RTTEnvironmentChecker:
         required_missing = []
         optional_missing = []
 
-        for result in self.results:
-            if result.status == CheckStatus.FAIL:
-                tool_info = None
-                if result.tool_name in self.REQUIRED_TOOLS:
-                    tool_info = self.REQUIRED_TOOLS[result.tool_name]
-                    required_missing.append(result.tool_name)
-                elif result.tool_name in self.OPTIONAL_TOOLS:
-                    tool_info = self.OPTIONAL_TOOLS[result.tool_name]
-                    optional_missing.append(result.tool_name)
-
-                if tool_info and tool_info.install_cmd and distro_id in tool_info.install_cmd:
-                    cmd = tool_info.install_cmd[distro_id]
-                    install_cmds[result.tool_name] = cmd
+        for result in self._by_status[CheckStatus.FAIL]:
+            tool_info = None
+            if result.tool_name in self.REQUIRED_TOOLS:
+                tool_info = self.REQUIRED_TOOLS[result.tool_name]
+                required_missing.append(result.tool_name)
+            elif result.tool_name in self.OPTIONAL_TOOLS:
+                tool_info = self.OPTIONAL_TOOLS[result.tool_name]
+                optional_missing.append(result.tool_name)
+
+            cmd = tool_info.get_install_cmd(distro_id) if tool_info else None
+            if cmd:
+                install_cmds[result.tool_name] = cmd
 
         return {
             "required": required_missing,
@@ -496,65 +672,68 @@ class RTTEnvironmentChecker:
 
     def print_recommendations(self):
         """打印建议"""
-        print("\n📋 建议与修复:")
-        print("=" * 60)
+        # 先拼接完整输出，再一次性写出
+        lines = []
+        lines.append("\n📋 建议与修复:")
+        lines.append("=" * 60)
 
         # 检查失败的必要工具
         failed_required = [
-            r for r in self.results
-            if r.status == CheckStatus.FAIL and r.tool_name in self.REQUIRED_TOOLS
+            r for r in self._by_status[CheckStatus.FAIL]
+            if r.tool_name in self.REQUIRED_TOOLS
         ]
 
         if failed_required:
-            print("1. 需要安装的必要工具:")
+            lines.append("1. 需要安装的必要工具:")
             for result in failed_required:
-                print(f"   - {result.description} ({result.tool_name})")
+                lines.append(f"   - {result.description} ({result.tool_name})")
 
             install_info = self.get_install_commands()
             if install_info["commands"]:
-                print("\n   安装命令:")
+                lines.append("\n   安装命令:")
+                failed_names = {r.tool_name for r in failed_required}
                 for tool, cmd in install_info["commands"].items():
-                    if tool in [r.tool_name for r in failed_required]:
-                        print(f"   sudo {cmd}  # 安装 {tool}")
+                    if tool in failed_names:
+                        lines.append(f"   sudo {cmd}  # 安装 {tool}")
 
         # 检查警告
-        warnings = [r for r in self.results if r.status == CheckStatus.WARNING]
+        warnings = self._by_status[CheckStatus.WARNING]
         if warnings:
-            print("\n2. 警告:")
+            lines.append("\n2. 警告:")
             for result in warnings:
                 if result.message:
-                    print(f"   - {result.description}: {result.message}")
+                    lines.append(f"   - {result.description}: {result.message}")
                 elif result.error:
-                    print(f"   - {result.description}: {result.error}")
+                    lines.append(f"   - {result.description}: {result.error}")
 
         # packaging模块提示
         if not self.packaging_available:
-            print("\n3. 版本检查优化:")
-            print("   - packaging模块未安装，无法进行精确的版本兼容性检查")
-            print("     可选安装: pip3 install packaging")
+            lines.append("\n3. 版本检查优化:")
+            lines.append("   - packaging模块未安装，无法进行精确的版本兼容性检查")
+            lines.append("     可选安装: pip3 install packaging")
 
         # PATH建议
         path_warnings = [r for r in self.results if "PATH" in r.description]
         if path_warnings:
-            print("\n4. 环境变量设置:")
+            lines.append("\n4. 环境变量设置:")
             for result in path_warnings:
-                print(f"   - {result.message}")
+                lines.append(f"   - {result.message}")
 
             # 检测到的工具链路径（去重）
             tool_paths = set()
             for result in self.results:
                 if result.path and "arm-none-eabi" in result.tool_name:
                     tool_dir = os.path.dirname(result.path)
-                    if tool_dir and tool_dir not in self.path_dirs:
+                    if tool_dir and os.path.normpath(tool_dir) not in self._path_set:
                         tool_paths.add(tool_dir)
 
             if tool_paths:
-                print("\n   将以下路径添加到~/.bashrc或~/.zshrc:")
+                lines.append("\n   将以下路径添加到~/.bashrc或~/.zshrc:")
                 for path in sorted(tool_paths):
-                    print(f'   export PATH="{path}:$PATH"')
+                    lines.append(f'   export PATH="{path}:$PATH"')
 
         # RT-Thread环境变量
-        print("\n5. RT-Thread环境变量:")
+        lines.append("\n5. RT-Thread环境变量:")
         arm_gcc_path = None
         for result in self.results:
             if result.tool_name == "arm-none-eabi-gcc" and result.path:
@@ -562,27 +741,28 @@ class RTTEnvironmentChecker:
                 break
 
         if arm_gcc_path:
-            print(f'   export RTT_EXEC_PATH="{arm_gcc_path}"')
+            lines.append(f'   export RTT_EXEC_PATH="{arm_gcc_path}"')
         else:
-            print('   # 请先安装arm-none-eabi-gcc，然后设置:')
-            print('   # export RTT_EXEC_PATH="你的工具链根目录"')
+            lines.append('   # 请先安装arm-none-eabi-gcc，然后设置:')
+            lines.append('   # export RTT_EXEC_PATH="你的工具链根目录"')
 
-        print('   export RTT_CC=gcc')
-        print('\n   应用配置: source ~/.bashrc 或 source ~/.zshrc')
+        lines.append('   export RTT_CC=gcc')
+        lines.append('\n   应用配置: source ~/.bashrc 或 source ~/.zshrc')
 
         # 测试编译
-        print("\n6. 测试编译:")
-        print("   克隆RT-Thread示例项目:")
-        print("   git clone https://github.com/RT-Thread/rt-thread.git")
-        print("   cd rt-thread/bsp/stm32/stm32f407-atk-explorer")
-        print("   scons")
+        lines.append("\n6. 测试编译:")
+        lines.append("   克隆RT-Thread示例项目:")
+        lines.append("   git clone https://github.com/RT-Thread/rt-thread.git")
+        lines.append("   cd rt-thread/bsp/stm32/stm32f407-atk-explorer")
+        lines.append("   scons")
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def get_summary(self) -> Dict:
         """获取检查摘要"""
         total = len(self.results)
-        passed = len([r for r in self.results if r.status == CheckStatus.PASS])
-        failed = len([r for r in self.results if r.status == CheckStatus.FAIL])
-        warnings = len([r for r in self.results if r.status == CheckStatus.WARNING])
+        passed = len(self._by_status[CheckStatus.PASS])
+        failed = len(self._by_status[CheckStatus.FAIL])
+        warnings = len(self._by_status[CheckStatus.WARNING])
 
         return {
             "total": total,
@@ -608,13 +788,13 @@ class RTTEnvironmentChecker:
 
         report = {
             "summary": self.get_summary(),
-            "results": [r.to_dict() for r in self.results],
+            "results": self.results,
             "recommendations": self.get_install_commands()
         }
 
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                f.write(_dumps_json(report))
 
             if self.verbose:
                 print(f"\n📄 检查报告已保存到: {filepath}")
@@ -624,6 +804,7 @@ class RTTEnvironmentChecker:
 
 def main():
     """主函数"""
+    import argparse
     parser = argparse.ArgumentParser(description='RT-Thread编译环境检查工具')
     parser.add_argument('--silent', '-s', action='store_true',
                        help='静默模式，只返回退出码')
@@ -635,11 +816,14 @@ def main():
                        help='保存报告到.env-reports目录')
     parser.add_argument('--report-path', type=str,
                        help='保存报告到指定路径')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='不使用命令结果缓存，重新执行所有检查')
 
     args = parser.parse_args()
 
     # 创建检查器
-    checker = RTTEnvironmentChecker(verbose=not args.silent, timeout=args.timeout)
+    checker = RTTEnvironmentChecker(verbose=not args.silent, timeout=args.timeout,
+                                    use_cache=not args.no_cache)
 
     # 运行检查
     results = checker.run_checks()
@@ -661,9 +845,9 @@ def main():
     if args.json:
         report = {
             "summary": checker.get_summary(),
-            "results": [r.to_dict() for r in results]
+            "results": results
         }
-        print(json.dumps(report, indent=2, ensure_ascii=False))
+        print(_dumps_json(report).decode('utf-8'))
 
     # 退出码
     summary = checker.get_summary()
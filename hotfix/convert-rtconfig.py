@@ -5,22 +5,151 @@ RT-Thread BSP配置迁移工具
 原理：分析提取关键信息，生成新的Linux友好配置
 """
 
+import io
 import os
 import re
 import sys
 import shutil
+import tempfile
 import ast
+import keyword
 import getopt
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
 
+# ====================================================
+# 预编译的正则表达式（模块级，避免每次调用重复查找/编译）
+# ====================================================
+
+# 关键变量名 -> 分析结果中的键
+_KEY_VARS = {
+    'ARCH': 'arch', 'arch': 'arch',
+    'CPU': 'cpu', 'cpu': 'cpu',
+    'CROSS_TOOL': 'cross_tool',
+    'PLATFORM': 'platform', 'platform': 'platform',
+    'EXEC_PATH': 'exec_path', 'exec_path': 'exec_path',
+    'BUILD': 'build', 'build': 'build',
+}
+
+# 正则回退提取的关键变量
+_VAR_RES = {
+    'ARCH': re.compile(r'ARCH\s*=\s*[\'"]([^\'"]+)[\'"]', re.IGNORECASE),
+    'CPU': re.compile(r'CPU\s*=\s*[\'"]([^\'"]+)[\'"]', re.IGNORECASE),
+    'CROSS_TOOL': re.compile(r'CROSS_TOOL\s*=\s*[\'"]([^\'"]+)[\'"]', re.IGNORECASE),
+    'PLATFORM': re.compile(r'PLATFORM\s*=\s*[\'"]([^\'"]+)[\'"]', re.IGNORECASE),
+    'EXEC_PATH': re.compile(r'EXEC_PATH\s*=\s*(.+?)(?:\n|$)', re.IGNORECASE),
+    'BUILD': re.compile(r'BUILD\s*=\s*[\'"]([^\'"]+)[\'"]', re.IGNORECASE),
+}
+
+# dist_handle函数
+_DIST_HANDLE_RE = re.compile(r'def\s+dist_handle\s*\([^)]*\)\s*:(.*?)(?=\n\s*def\s|\n\s*$|\Z)', re.DOTALL)
+_DIST_HANDLE_LOOSE_RE = re.compile(r'def\s+dist_handle\s*\(.*?\).*?(?:\n{2,}|\Z)', re.DOTALL)
+
+# 链接脚本（按优先级排列，_scan_once按各自的子串 -T、link_script、LINK_SCRIPT 分别筛选候选行）
+_LINK_SCRIPT_RES = (
+    re.compile(r'-T\s+([\w/\.\-_]+\.lds?)'),
+    re.compile(r'link_script\s*=\s*[\'"]([^\'"]+)[\'"]'),
+    re.compile(r'LINK_SCRIPT\s*=\s*[\'"]([^\'"]+)[\'"]'),
+)
+
+# 编译参数：匹配 CFLAGS, AFLAGS, LFLAGS 的各种赋值方式（支持无引号赋值）
+_FLAG_RES = {
+    name: re.compile(name + r'\s*[+:]?=\s*(.+?)(?=\n\s*\w+\s*[=:]|\n\s*$|#)',
+                     re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    for name in ('CFLAGS', 'AFLAGS', 'LFLAGS')
+}
+
+# 无需语法树的简单行：空行、注释或 NAME = 单行字面量
+_BLANK_OR_COMMENT_RE = re.compile(r'[ \t]*(?:#.*)?\n?')
+_SIMPLE_ASSIGN_RE = re.compile(
+    r'([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*'
+    r'(\'[^\'\\\n]*\'|"[^"\\\n]*"|0|[1-9][0-9]*|True|False|None)'
+    r'[ \t]*(?:#.*)?\n?'
+)
+# 空字符及splitlines额外识别的行分隔符（出现时交给ast.parse处理）
+_ODD_CHARS_RE = re.compile(r'[\x00\x0b\x0c\x1c-\x1e\x85\u2028\u2029]')
+_SIMPLE_CONSTANTS = {'True': True, 'False': False, 'None': None}
+
+# 复合语句中包含子语句的字段（按ast._fields中的顺序；handlers和cases的元素自身也带body）
+_AST_BLOCK_FIELDS = ('body', 'handlers', 'orelse', 'finalbody', 'cases')
+
+# 新语句的开始（编译参数值在此处结束）
+_STATEMENT_START_RE = re.compile(r'\s*\w+\s*[=:]')
+
+# 宏定义和包含路径
+_DEFINE_RE = re.compile(r'-D([\w_][\w\d_]*)')
+_INCLUDE_RE = re.compile(r'-I([^\s\'"]+)')
+
+# 可从原始CFLAGS中保留的通用选项
+_USEFUL_FLAG_RES = (
+    re.compile(r'(-fstack-usage)'),
+    re.compile(r'(-fdump-rtl-\w+)'),
+    re.compile(r'(-std=\w+)'),
+)
+
+# GCC不支持的关键字（顺序即检测时的优先级）
+_UNSUPPORTED_GCC_KEYWORDS = (
+    '--apcs=interwork',
+    '-D__MICROLIB',
+    '--pd "__MICROLIB SETA 1"',
+    '--library_type=microlib',
+    '--cpu Cortex-M4.fp',
+    '--diag_suppress Pa050',
+    '-Dewarm',
+    '--no_cse',
+    '--no_unroll',
+    '--no_inline',
+    '--no_code_motion',
+    '--no_tbaa',
+    '--no_clustering',
+    '--no_scheduling',
+    '--target=arm-arm-none-eabi',
+    '--list rt-thread.map',
+    '--strict',
+)
+# 合并为一个交替模式，一次扫描完成检测或删除
+_UNSUPPORTED_RE = re.compile('|'.join(re.escape(kw) for kw in _UNSUPPORTED_GCC_KEYWORDS))
+_UNSUPPORTED_PRIORITY = {kw: index for index, kw in enumerate(_UNSUPPORTED_GCC_KEYWORDS)}
+# 其中的-D宏名（不含-D前缀），提取宏定义时直接按名字过滤
+_UNSUPPORTED_DEFINE_TOKENS = frozenset(
+    kw[2:] for kw in _UNSUPPORTED_GCC_KEYWORDS if kw.startswith('-D')
+)
+
+# 编译参数值首尾需去除的引号、加号和空白
+_FLAG_STRIP_CHARS = '"\'+ \t\n'
+
+# 写入生成文件时使用的缓冲区大小
+_WRITE_BUFFER_SIZE = 128 * 1024
+
+@lru_cache(maxsize=256)
+def _load(path_str: str, mtime_ns: int, size: int) -> Tuple[str, Tuple[str, ...]]:
+    """
+    读取并解码文件，返回 (内容, 按行拆分的内容)
+    以 (路径, mtime, 大小) 为键缓存，文件被修改后自动失效
+    """
+    content = Path(path_str).read_bytes().decode('utf-8', 'ignore')
+    # 与read_text一致，统一换行符
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content, tuple(content.splitlines(keepends=True))
+
+def clear_cache():
+    """清空文件内容缓存"""
+    _load.cache_clear()
+
 class RTConfigAnalyzer:
     """分析rtconfig.py文件，提取关键信息"""
 
+    # GCC不支持的关键字集合（成员判断为O(1)）
+    unsupported_gcc_keywords = frozenset(_UNSUPPORTED_GCC_KEYWORDS)
+
     def __init__(self, file_path: str):
         self.file_path = Path(file_path)
-        self.content = self.file_path.read_text(encoding='utf-8', errors='ignore')
+        st = self.file_path.stat()
+        self.content, self.lines = _load(str(self.file_path), st.st_mtime_ns, st.st_size)
         self.variables = {}
         self.functions = {}
         self.parsed_successfully = False
@@ -29,26 +158,13 @@ class RTConfigAnalyzer:
         self.all_defines = set()
         self.all_includes = set()
 
-        # GCC不支持的关键字列表
-        self.unsupported_gcc_keywords = [
-            '--apcs=interwork',
-            '-D__MICROLIB',
-            '--pd "__MICROLIB SETA 1"',
-            '--library_type=microlib',
-            '--cpu Cortex-M4.fp',
-            '--diag_suppress Pa050',
-            '-Dewarm',
-            '--no_cse',
-            '--no_unroll',
-            '--no_inline',
-            '--no_code_motion',
-            '--no_tbaa',
-            '--no_clustering',
-            '--no_scheduling',
-            '--target=arm-arm-none-eabi',
-            '--list rt-thread.map',
-            '--strict',
-        ]
+        # 由_scan_once填充的候选文本，各提取函数只在其上运行正则
+        self._define_text = ''
+        self._include_text = ''
+        self._link_script_lines = ([], [], [])
+        self._flag_segments = []
+        self._dist_handle_pos = None
+        self._simple_assignments = []
 
         # Windows路径模式
         self.windows_path_patterns = [
@@ -57,6 +173,8 @@ class RTConfigAnalyzer:
             r'D:\\Progrem\\.*',
             r'Program Files.*',
         ]
+        # 各模式本身是正则表达式，合并为一个忽略大小写的模式，一次扫描完成判断
+        self._windows_path_re = re.compile('|'.join(self.windows_path_patterns), re.IGNORECASE)
 
     def analyze(self) -> Dict[str, Any]:
         """分析文件，返回结构化信息"""
@@ -76,20 +194,27 @@ class RTConfigAnalyzer:
             'includes': set(),
         }
 
+        # 单次遍历文件，筛选各类候选行
+        self._scan_once()
+
         # 首先提取dist_handle函数
         self._extract_dist_handle()
 
         # 提取链接脚本路径
         self._extract_link_script()
 
-        # 方法1：尝试解析Python语法树
-        try:
-            tree = ast.parse(self.content)
-            self._extract_from_ast(tree, result)
+        # 方法1：尝试解析Python语法树（仅含简单赋值的文件无需构建语法树）
+        if not self._needs_ast():
+            self._extract_simple_assignments(result)
             self.parsed_successfully = True
-        except SyntaxError as e:
-            print(f"⚠️  AST解析失败，使用正则表达式提取: {e}")
-            self._extract_with_regex(result)
+        else:
+            try:
+                tree = ast.parse(self.content)
+                self._extract_from_ast(tree, result)
+                self.parsed_successfully = True
+            except SyntaxError as e:
+                print(f"⚠️  AST解析失败，使用正则表达式提取: {e}")
+                self._extract_with_regex(result)
 
         # 分析编译参数
         self._analyze_compiler_flags_fixed(result)
@@ -103,9 +228,98 @@ class RTConfigAnalyzer:
         result['includes'] = self.all_includes
         return result
 
+    def _scan_once(self):
+        """
+        单次遍历所有行，用廉价的子串判断筛选候选行：
+        -D/-I、链接脚本、编译参数语句和dist_handle定义位置，
+        后续正则只在候选文本上运行，避免多次扫描整个文件
+        """
+        define_lines = []
+        include_lines = []
+        link_script_lines = ([], [], [])  # 与_LINK_SCRIPT_RES一一对应
+        flag_segments = []
+        flag_start = None  # 当前编译参数语句的起始行号
+        value_pending = False  # 上一行以'='结尾，值从后续第一个非空行开始
+        offset = 0
+
+        for index, line in enumerate(self.lines):
+            stripped = line.strip()
+            # 编译参数值在空行或下一条赋值语句处结束（与_FLAG_RES的前瞻一致）
+            if (flag_start is not None and not value_pending
+                    and (not stripped or _STATEMENT_START_RE.match(line))):
+                flag_segments.append(''.join(self.lines[flag_start:index]))
+                flag_start = None
+            if stripped:
+                value_pending = False
+            if '=' in line and 'flags' in line.lower():
+                if flag_start is None:
+                    flag_start = index
+                value_pending = stripped.endswith('=')
+
+            if '-D' in line:
+                define_lines.append(line)
+            if '-I' in line:
+                include_lines.append(line)
+            if '-T' in line:
+                link_script_lines[0].append(line)
+            if 'link_script' in line:
+                link_script_lines[1].append(line)
+            if 'LINK_SCRIPT' in line:
+                link_script_lines[2].append(line)
+            if self._dist_handle_pos is None and 'dist_handle' in line and 'def' in line:
+                self._dist_handle_pos = offset
+
+            offset += len(line)
+
+        if flag_start is not None:
+            flag_segments.append(''.join(self.lines[flag_start:]))
+
+        self._define_text = ''.join(define_lines)
+        self._include_text = ''.join(include_lines)
+        self._link_script_lines = link_script_lines
+        self._flag_segments = flag_segments
+
+    def _needs_ast(self) -> bool:
+        """
+        判断是否需要解析语法树：文件只由空行、注释和顶层的
+        NAME = 单行字面量 组成时返回False，其余情况（import、def、if、
+        续行、多行字面量等）一律返回True
+        """
+        # 保证self.lines与Python的行划分一致
+        if _ODD_CHARS_RE.search(self.content):
+            return True
+        assignments = []
+        for line in self.lines:
+            if _BLANK_OR_COMMENT_RE.fullmatch(line):
+                continue
+            match = _SIMPLE_ASSIGN_RE.fullmatch(line)
+            if not match or keyword.iskeyword(match.group(1)):
+                return True
+            assignments.append(match.groups())
+        self._simple_assignments = assignments
+        return False
+
+    def _extract_simple_assignments(self, result: Dict[str, Any]):
+        """从_needs_ast收集的简单赋值中提取变量，结果与语法树提取一致"""
+        for var_name, literal in self._simple_assignments:
+            if literal[0] in '\'"':
+                var_value = literal[1:-1]
+            elif literal in _SIMPLE_CONSTANTS:
+                var_value = _SIMPLE_CONSTANTS[literal]
+            else:
+                var_value = int(literal)
+            result['original_variables'][var_name] = var_value
+            key = _KEY_VARS.get(var_name)
+            if key:
+                result[key] = var_value
+
     def _extract_from_ast(self, tree: ast.AST, result: Dict[str, Any]):
-        """从AST提取变量"""
-        for node in ast.walk(tree):
+        """从AST提取变量（遍历所有语句块，不进入函数和类定义体）"""
+        # 按层次顺序遍历，与ast.walk一致：后出现的（更深层的）赋值覆盖先前的值
+        statements = list(tree.body)
+        for node in statements:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
             if isinstance(node, ast.Assign):
                 for target in node.targets:
                     if isinstance(target, ast.Name):
@@ -116,85 +330,57 @@ class RTConfigAnalyzer:
                             result['original_variables'][var_name] = var_value
 
                             # 收集关键变量
-                            if var_name in ['ARCH', 'arch']:
-                                result['arch'] = var_value
-                            elif var_name in ['CPU', 'cpu']:
-                                result['cpu'] = var_value
-                            elif var_name in ['CROSS_TOOL', 'CROSS_TOOL']:
-                                result['cross_tool'] = var_value
-                            elif var_name in ['PLATFORM', 'platform']:
-                                result['platform'] = var_value
-                            elif var_name in ['EXEC_PATH', 'exec_path']:
-                                result['exec_path'] = var_value
-                            elif var_name in ['BUILD', 'build']:
-                                result['build'] = var_value
+                            key = _KEY_VARS.get(var_name)
+                            if key:
+                                result[key] = var_value
 
                         except (ValueError, SyntaxError):
                             # 不是字面量，记录表达式
                             result['original_variables'][var_name] = ast.unparse(node.value)
+            else:
+                # if/for/while/with/try/match等复合语句：按_fields顺序加入其子语句块
+                for field in _AST_BLOCK_FIELDS:
+                    statements.extend(getattr(node, field, ()))
 
     def _extract_with_regex(self, result: Dict[str, Any]):
         """使用正则表达式提取变量（当AST解析失败时）"""
-        patterns = {
-            'ARCH': r'ARCH\s*=\s*[\'"]([^\'"]+)[\'"]',
-            'CPU': r'CPU\s*=\s*[\'"]([^\'"]+)[\'"]',
-            'CROSS_TOOL': r'CROSS_TOOL\s*=\s*[\'"]([^\'"]+)[\'"]',
-            'PLATFORM': r'PLATFORM\s*=\s*[\'"]([^\'"]+)[\'"]',
-            'EXEC_PATH': r'EXEC_PATH\s*=\s*(.+?)(?:\n|$)',
-            'BUILD': r'BUILD\s*=\s*[\'"]([^\'"]+)[\'"]',
-        }
-
-        for var_name, pattern in patterns.items():
-            match = re.search(pattern, self.content, re.IGNORECASE)
+        for var_name, pattern in _VAR_RES.items():
+            match = pattern.search(self.content)
             if match:
                 value = match.group(1).strip('\'"')
                 result['original_variables'][var_name] = value
-
-                if var_name == 'ARCH':
-                    result['arch'] = value
-                elif var_name == 'CPU':
-                    result['cpu'] = value
-                elif var_name == 'CROSS_TOOL':
-                    result['cross_tool'] = value
-                elif var_name == 'PLATFORM':
-                    result['platform'] = value
-                elif var_name == 'EXEC_PATH':
-                    result['exec_path'] = value
-                elif var_name == 'BUILD':
-                    result['build'] = value
+                result[_KEY_VARS[var_name]] = value
 
     def _extract_dist_handle(self):
         """专门提取dist_handle函数"""
-        # 查找def dist_handle函数
-        pattern = r'def\s+dist_handle\s*\([^)]*\)\s*:(.*?)(?=\n\s*def\s|\n\s*$|\Z)'
-        match = re.search(pattern, self.content, re.DOTALL)
+        if self._dist_handle_pos is None:
+            return
+
+        # 查找def dist_handle函数（从候选行开始搜索）
+        match = _DIST_HANDLE_RE.search(self.content, self._dist_handle_pos)
 
         if match:
             # 获取完整函数定义
-            func_start = self.content.find(match.group(0))
-            func_end = func_start + len(match.group(0))
+            func_start, func_end = match.span()
 
-            # 向前找到def行开始
-            def_line_start = self.content.rfind('\n', 0, func_start) + 1
+            # 向前找到def行开始（不会早于候选行的行首）
+            def_line_start = self.content.rfind('\n', max(0, self._dist_handle_pos - 1), func_start) + 1
             self.dist_handle_code = self.content[def_line_start:func_end]
         else:
             # 尝试更宽松的匹配
-            pattern2 = r'def\s+dist_handle\s*\(.*?\).*?(?:\n{2,}|\Z)'
-            match2 = re.search(pattern2, self.content, re.DOTALL)
+            match2 = _DIST_HANDLE_LOOSE_RE.search(self.content, self._dist_handle_pos)
             if match2:
                 self.dist_handle_code = match2.group(0)
 
     def _extract_link_script(self):
         """提取链接脚本路径"""
-        # 查找链接脚本模式
-        patterns = [
-            r'-T\s+([\w/\.\-_]+\.lds?)',
-            r'link_script\s*=\s*[\'"]([^\'"]+)[\'"]',
-            r'LINK_SCRIPT\s*=\s*[\'"]([^\'"]+)[\'"]',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, self.content)
+        # 查找链接脚本模式（按优先级查找，每个模式只在含其子串的候选行中运行）
+        for pattern, candidates in zip(_LINK_SCRIPT_RES, self._link_script_lines):
+            match = None
+            for line in candidates:
+                match = pattern.search(line)
+                if match:
+                    break
             if match:
                 self.link_script_path = match.group(1)
                 if self.link_script_path:
@@ -223,189 +409,182 @@ class RTConfigAnalyzer:
         """修复的编译参数分析函数 - 支持无引号赋值"""
         unsupported = []
 
-        # 修复的正则表达式：匹配 CFLAGS, AFLAGS, LFLAGS 的各种赋值方式
-        flag_patterns = {
-            'CFLAGS': r'CFLAGS\s*[+:]?=\s*(.+?)(?=\n\s*\w+\s*[=:]|\n\s*$|#)',
-            'AFLAGS': r'AFLAGS\s*[+:]?=\s*(.+?)(?=\n\s*\w+\s*[=:]|\n\s*$|#)',
-            'LFLAGS': r'LFLAGS\s*[+:]?=\s*(.+?)(?=\n\s*\w+\s*[=:]|\n\s*$|#)',
-        }
-
-        for flag_name, pattern in flag_patterns.items():
-            matches = re.findall(pattern, self.content, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+        for flag_name, pattern in _FLAG_RES.items():
+            matches = [match for segment in self._flag_segments for match in pattern.findall(segment)]
             for match in matches:
                 # 清理匹配的字符串
                 flag_value = match.strip()
-                # 移除行尾注释
-                flag_value = re.sub(r'#.*$', '', flag_value)
+                # 移除行尾注释（只处理最后一行，与原先的 #.*$ 一致）
+                comment_pos = flag_value.find('#', flag_value.rfind('\n') + 1)
+                if comment_pos >= 0:
+                    flag_value = flag_value[:comment_pos]
                 # 移除首尾的单引号、双引号和加号
-                flag_value = flag_value.strip('"\'+ \t\n')
+                flag_value = flag_value.strip(_FLAG_STRIP_CHARS)
 
                 if flag_value:
-                    # 检查不支持的GCC关键字
-                    for keyword in self.unsupported_gcc_keywords:
-                        if keyword in flag_value:
-                            unsupported.append({
-                                'flag': flag_name,
-                                'value': flag_value,
-                                'unsupported_keyword': keyword
-                            })
-                            break
+                    # 检查不支持的GCC关键字（多个命中时按列表顺序报告第一个）
+                    found = {m.group(0) for m in _UNSUPPORTED_RE.finditer(flag_value)}
+                    if found:
+                        unsupported.append({
+                            'flag': flag_name,
+                            'value': flag_value,
+                            'unsupported_keyword': min(found, key=_UNSUPPORTED_PRIORITY.get)
+                        })
 
         result['unsupported_configs'] = unsupported
 
     def _extract_defines_and_includes_fixed(self):
         """修复的提取宏定义和包含路径函数 - 简化逻辑避免语法错误"""
         # 简单但可靠的提取方法：从整个文件中查找-D和-I参数
-        # 查找所有 -Dxxx 和 -Ixxx 模式
-        define_pattern = r'-D([\w_][\w\d_]*)'
-        include_pattern = r'-I([^\s\'"]+)'
-
+        # 查找所有 -Dxxx 和 -Ixxx 模式（两个模式的分组都不会为空，无需再判断空串）
         # 提取所有-D定义
-        for match in re.findall(define_pattern, self.content):
-            if match and match != 'gcc' and f'-D{match}' not in self.unsupported_gcc_keywords:
-                self.all_defines.add(match)
+        self.all_defines.update(
+            define for define in (m.group(1) for m in _DEFINE_RE.finditer(self._define_text))
+            if define != 'gcc' and define not in _UNSUPPORTED_DEFINE_TOKENS
+        )
 
         # 提取所有-I包含路径
-        for match in re.findall(include_pattern, self.content):
-            if match and match.strip() and not match.startswith('+'):
-                self.all_includes.add(match)
+        self.all_includes.update(
+            include for include in (m.group(1) for m in _INCLUDE_RE.finditer(self._include_text))
+            if not include.startswith('+')
+        )
+
+    def remove_unsupported(self, flags: str) -> str:
+        """删除参数字符串中所有GCC不支持的关键字"""
+        return _UNSUPPORTED_RE.sub('', flags)
 
     def is_windows_path(self, path: str) -> bool:
         """检查是否为Windows路径"""
         if not path:
             return False
-        path_lower = path.lower()
-        return any(pattern.lower() in path_lower for pattern in self.windows_path_patterns)
+        return self._windows_path_re.search(path) is not None
+
+# ====================================================
+# 生成rtconfig.py使用的文本模板
+# ====================================================
+
+# 生成的rtconfig.py整体模板，末尾的其他编译器分支只保留结构，不会被执行
+_RTCONFIG_TEMPLATE = '''#!/usr/bin/env python3
+"""
+RT-Thread BSP配置文件
+从原始配置自动迁移生成，适配Linux环境
+原始文件: {original_name}
+生成时间: {timestamp}
+"""
+
+import os
+
+# ====================================================
+# 基本配置
+# ====================================================
+ARCH = '{arch}'
+CPU = '{cpu}'
+CROSS_TOOL = 'gcc'
+
+# BSP库类型
+BSP_LIBRARY_TYPE = None
+
+# 环境变量覆盖
+if os.getenv('RTT_CC'):
+    CROSS_TOOL = os.getenv('RTT_CC')
+if os.getenv('RTT_ROOT'):
+    RTT_ROOT = os.getenv('RTT_ROOT')
+
+# 工具链选择 - Linux下只支持GCC
+if CROSS_TOOL == 'gcc':
+    PLATFORM = 'gcc'
+    EXEC_PATH = '/usr/bin'  # Linux默认路径
+elif CROSS_TOOL == 'keil':
+    print("警告: Keil MDK在Linux下不可用，请切换到GCC")
+    PLATFORM = 'armcc'
+    EXEC_PATH = '/usr/bin'
+elif CROSS_TOOL == 'iar':
+    print("警告: IAR在Linux下不可用，请切换到GCC")
+    PLATFORM = 'iccarm'
+    EXEC_PATH = '/usr/bin'
+else:
+    print(f"不支持的编译器: {{CROSS_TOOL}}")
+    exit(1)
+
+if os.getenv('RTT_EXEC_PATH'):
+    EXEC_PATH = os.getenv('RTT_EXEC_PATH')
+
+BUILD = '{build}'
+
+# ====================================================
+# GCC工具链配置
+# ====================================================
+if PLATFORM == 'gcc':
+    # 工具链命令
+    PREFIX = 'arm-none-eabi-'
+    CC = PREFIX + 'gcc'
+    AS = PREFIX + 'gcc'
+    AR = PREFIX + 'ar'
+    CXX = PREFIX + 'g++'
+    LINK = PREFIX + 'gcc'
+    TARGET_EXT = 'elf'
+    SIZE = PREFIX + 'size'
+    OBJDUMP = PREFIX + 'objdump'
+    OBJCPY = PREFIX + 'objcopy'
+
+    # 编译参数
+    DEVICE = '{device_flags}'
+    CFLAGS = DEVICE + '{cflags}'
+    AFLAGS = ' -c' + DEVICE + ' -x assembler-with-cpp -Wa,-mimplicit-it=thumb '
+    LFLAGS = DEVICE + ' -Wl,--gc-sections,-Map=rt-thread.map,-cref,-u,Reset_Handler -T {ld_script}'
+    CPATH = ''
+    LPATH = ''
+
+    if BUILD == 'debug':
+        CFLAGS += ' -O0 -gdwarf-2 -g'
+        AFLAGS += ' -gdwarf-2'
+    else:
+        CFLAGS += ' -O2'
+
+    CXXFLAGS = CFLAGS
+
+    POST_ACTION = OBJCPY + ' -O binary $TARGET rtthread.bin\\n' + SIZE + ' $TARGET \\n'
+
+elif PLATFORM == 'armcc':
+    # ARMCC配置 (Linux下不可用)
+    print("错误: ARMCC在Linux下不可用，请使用GCC")
+    exit(1)
+
+elif PLATFORM == 'armclang':
+    # ARMClang配置 (Linux下不可用)
+    print("错误: ARMClang在Linux下不可用，请使用GCC")
+    exit(1)
+
+elif PLATFORM == 'iccarm':
+    # IAR配置 (Linux下不可用)
+    print("错误: IAR在Linux下不可用，请使用GCC")
+    exit(1)
+
+else:
+    print('不支持的平台: ' + PLATFORM)
+    exit(1)
+{dist_handle_block}'''
+
+_DIST_HANDLE_HEADER = '''
+
+# ====================================================
+# 发布处理函数 (从原始文件保留)
+# ====================================================
+'''
 
 class RTConfigGenerator:
     """生成Linux友好的rtconfig.py"""
 
-    def __init__(self, analyzer: RTConfigAnalyzer, analysis: Dict[str, Any]):
+    def __init__(self, analyzer: RTConfigAnalyzer, analysis: Dict[str, Any],
+                 now: Optional[datetime] = None):
         self.analyzer = analyzer
         self.analysis = analysis
-        self.generated_lines = []
         self.removed_flags = []
+        # 时间戳在一次运行中不变，只生成一次
+        self._timestamp = (now or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
 
     def generate(self) -> str:
-        """生成新的rtconfig.py内容"""
-        self.generated_lines = []
-
-        # 头部注释
-        self._add_header()
-
-        # 导入
-        self.generated_lines.append('import os')
-        self.generated_lines.append('')
-
-        # 基本配置
-        self._add_basic_config()
-
-        # 工具链配置
-        self._add_toolchain_config()
-
-        # GCC配置
-        self._add_gcc_config()
-
-        # dist_handle函数
-        if self.analyzer.dist_handle_code:
-            self.generated_lines.append('')
-            self.generated_lines.append('# ====================================================')
-            self.generated_lines.append('# 发布处理函数 (从原始文件保留)')
-            self.generated_lines.append('# ====================================================')
-            self.generated_lines.append(self.analyzer.dist_handle_code)
-
-        return '\n'.join(self.generated_lines)
-
-    def _add_header(self):
-        """添加文件头"""
-        self.generated_lines.append('#!/usr/bin/env python3')
-        self.generated_lines.append('"""')
-        self.generated_lines.append(f'RT-Thread BSP配置文件')
-        self.generated_lines.append(f'从原始配置自动迁移生成，适配Linux环境')
-        self.generated_lines.append(f'原始文件: {Path(self.analysis.get("original_file", "")).name}')
-        self.generated_lines.append(f'生成时间: {self._get_timestamp()}')
-        self.generated_lines.append('"""')
-        self.generated_lines.append('')
-
-    def _add_basic_config(self):
-        """添加基本配置"""
-        arch = self.analysis.get('arch', 'arm')
-        cpu = self.analysis.get('cpu', 'cortex-m4')
-        build = self.analysis.get('build', 'debug')
-
-        self.generated_lines.append('# ====================================================')
-        self.generated_lines.append('# 基本配置')
-        self.generated_lines.append('# ====================================================')
-        self.generated_lines.append(f'ARCH = \'{arch}\'')
-        self.generated_lines.append(f'CPU = \'{cpu}\'')
-        self.generated_lines.append(f'CROSS_TOOL = \'gcc\'')
-        self.generated_lines.append('')
-        self.generated_lines.append('# BSP库类型')
-        self.generated_lines.append('BSP_LIBRARY_TYPE = None')
-        self.generated_lines.append('')
-
-        # 环境变量
-        self.generated_lines.append('# 环境变量覆盖')
-        self.generated_lines.append('if os.getenv(\'RTT_CC\'):')
-        self.generated_lines.append('    CROSS_TOOL = os.getenv(\'RTT_CC\')')
-        self.generated_lines.append('if os.getenv(\'RTT_ROOT\'):')
-        self.generated_lines.append('    RTT_ROOT = os.getenv(\'RTT_ROOT\')')
-        self.generated_lines.append('')
-
-        # 工具链选择
-        self.generated_lines.append('# 工具链选择 - Linux下只支持GCC')
-        self.generated_lines.append('if CROSS_TOOL == \'gcc\':')
-        self.generated_lines.append('    PLATFORM = \'gcc\'')
-        self.generated_lines.append('    EXEC_PATH = \'/usr/bin\'  # Linux默认路径')
-        self.generated_lines.append('elif CROSS_TOOL == \'keil\':')
-        self.generated_lines.append('    print(\"警告: Keil MDK在Linux下不可用，请切换到GCC\")')
-        self.generated_lines.append('    PLATFORM = \'armcc\'')
-        self.generated_lines.append('    EXEC_PATH = \'/usr/bin\'')
-        self.generated_lines.append('elif CROSS_TOOL == \'iar\':')
-        self.generated_lines.append('    print(\"警告: IAR在Linux下不可用，请切换到GCC\")')
-        self.generated_lines.append('    PLATFORM = \'iccarm\'')
-        self.generated_lines.append('    EXEC_PATH = \'/usr/bin\'')
-        self.generated_lines.append('else:')
-        self.generated_lines.append('    print(f\"不支持的编译器: {CROSS_TOOL}\")')
-        self.generated_lines.append('    exit(1)')
-        self.generated_lines.append('')
-
-        # 环境变量路径覆盖
-        self.generated_lines.append('if os.getenv(\'RTT_EXEC_PATH\'):')
-        self.generated_lines.append('    EXEC_PATH = os.getenv(\'RTT_EXEC_PATH\')')
-        self.generated_lines.append('')
-
-        self.generated_lines.append(f'BUILD = \'{build}\'')
-        self.generated_lines.append('')
-
-    def _add_toolchain_config(self):
-        """添加工具链配置"""
-        self.generated_lines.append('# ====================================================')
-        self.generated_lines.append('# GCC工具链配置')
-        self.generated_lines.append('# ====================================================')
-        self.generated_lines.append('if PLATFORM == \'gcc\':')
-
-        # 从原始配置中提取有用的参数
-        cpu = self.analysis.get('cpu', 'cortex-m4')
-        fpu = self._determine_fpu(cpu)
-        float_abi = 'hard' if fpu else 'soft'
-
-        # 工具定义
-        self.generated_lines.append('    # 工具链命令')
-        self.generated_lines.append('    PREFIX = \'arm-none-eabi-\'')
-        self.generated_lines.append('    CC = PREFIX + \'gcc\'')
-        self.generated_lines.append('    AS = PREFIX + \'gcc\'')
-        self.generated_lines.append('    AR = PREFIX + \'ar\'')
-        self.generated_lines.append('    CXX = PREFIX + \'g++\'')
-        self.generated_lines.append('    LINK = PREFIX + \'gcc\'')
-        self.generated_lines.append('    TARGET_EXT = \'elf\'')
-        self.generated_lines.append('    SIZE = PREFIX + \'size\'')
-        self.generated_lines.append('    OBJDUMP = PREFIX + \'objdump\'')
-        self.generated_lines.append('    OBJCPY = PREFIX + \'objcopy\'')
-        self.generated_lines.append('')
-
-    def _add_gcc_config(self):
-        """添加GCC编译参数"""
+        """生成新的rtconfig.py内容（一次渲染整个模板）"""
         cpu = self.analysis.get('cpu', 'cortex-m4')
         fpu = self._determine_fpu(cpu)
         float_abi = 'hard' if fpu else 'soft'
@@ -416,66 +595,26 @@ class RTConfigGenerator:
             device_flags += f' -mfpu={fpu} -mfloat-abi={float_abi}'
         device_flags += ' -ffunction-sections -fdata-sections'
 
-        self.generated_lines.append('    # 编译参数')
-        self.generated_lines.append(f'    DEVICE = \'{device_flags}\'')
-
-        # CFLAGS - 从原始配置中提取，但过滤不支持的
-        cflags = self._generate_safe_cflags_fixed(device_flags)
-        self.generated_lines.append(f'    CFLAGS = DEVICE + \'{cflags}\'')
-
-        # AFLAGS
-        self.generated_lines.append(f'    AFLAGS = \' -c\' + DEVICE + \' -x assembler-with-cpp -Wa,-mimplicit-it=thumb \'')
-
-        # LFLAGS - 使用探测到的链接脚本路径
-        ld_script = self.analysis.get('linker_script', 'board/linker_scripts/link.lds')
-        self.generated_lines.append(f'    LFLAGS = DEVICE + \' -Wl,--gc-sections,-Map=rt-thread.map,-cref,-u,Reset_Handler -T {ld_script}\'')
-
-        self.generated_lines.append('    CPATH = \'\'')
-        self.generated_lines.append('    LPATH = \'\'')
-        self.generated_lines.append('')
-
-        # 优化选项
-        build = self.analysis.get('build', 'debug')
-        self.generated_lines.append('    if BUILD == \'debug\':')
-        self.generated_lines.append('        CFLAGS += \' -O0 -gdwarf-2 -g\'')
-        self.generated_lines.append('        AFLAGS += \' -gdwarf-2\'')
-        self.generated_lines.append('    else:')
-        self.generated_lines.append('        CFLAGS += \' -O2\'')
-        self.generated_lines.append('')
-
-        # C++标志
-        self.generated_lines.append('    CXXFLAGS = CFLAGS')
-        self.generated_lines.append('')
-
-        # 构建后操作
-        self.generated_lines.append('    POST_ACTION = OBJCPY + \' -O binary $TARGET rtthread.bin\\n\' + SIZE + \' $TARGET \\n\'')
-        self.generated_lines.append('')
-
-        # 其他编译器支持（但只定义，不会被执行）
-        self._add_other_compiler_stubs()
-
-        self.generated_lines.append('else:')
-        self.generated_lines.append('    print(\'不支持的平台: \' + PLATFORM)')
-        self.generated_lines.append('    exit(1)')
-        self.generated_lines.append('')
-
-    def _add_other_compiler_stubs(self):
-        """添加其他编译器存根（不会被执行，但保留结构）"""
-        self.generated_lines.append('elif PLATFORM == \'armcc\':')
-        self.generated_lines.append('    # ARMCC配置 (Linux下不可用)')
-        self.generated_lines.append('    print(\"错误: ARMCC在Linux下不可用，请使用GCC\")')
-        self.generated_lines.append('    exit(1)')
-        self.generated_lines.append('')
-        self.generated_lines.append('elif PLATFORM == \'armclang\':')
-        self.generated_lines.append('    # ARMClang配置 (Linux下不可用)')
-        self.generated_lines.append('    print(\"错误: ARMClang在Linux下不可用，请使用GCC\")')
-        self.generated_lines.append('    exit(1)')
-        self.generated_lines.append('')
-        self.generated_lines.append('elif PLATFORM == \'iccarm\':')
-        self.generated_lines.append('    # IAR配置 (Linux下不可用)')
-        self.generated_lines.append('    print(\"错误: IAR在Linux下不可用，请使用GCC\")')
-        self.generated_lines.append('    exit(1)')
-        self.generated_lines.append('')
+        ctx = {
+            'original_name': Path(self.analysis.get("original_file", "")).name,
+            'timestamp': self._get_timestamp(),
+            'arch': self.analysis.get('arch', 'arm'),
+            'cpu': cpu,
+            'build': self.analysis.get('build', 'debug'),
+            'device_flags': device_flags,
+            # CFLAGS - 从原始配置中提取，但过滤不支持的
+            'cflags': self._generate_safe_cflags_fixed(device_flags),
+            # LFLAGS - 使用探测到的链接脚本路径
+            'ld_script': self.analysis.get('linker_script', 'board/linker_scripts/link.lds'),
+            'dist_handle_block': self._dist_handle_block(),
+        }
+        return _RTCONFIG_TEMPLATE.format_map(ctx)
+
+    def _dist_handle_block(self) -> str:
+        """保留原始文件中的dist_handle函数"""
+        if not self.analyzer.dist_handle_code:
+            return ''
+        return _DIST_HANDLE_HEADER + self.analyzer.dist_handle_code
 
     def _determine_fpu(self, cpu: str) -> str:
         """根据CPU确定FPU类型"""
@@ -488,21 +627,17 @@ class RTConfigGenerator:
 
     def _generate_safe_cflags_fixed(self, device_flags: str) -> str:
         """修复的CFLAGS生成函数 - 保留所有-D和-I参数，但避免语法错误"""
-        safe_flags = ' -Dgcc'
+        parts = [' -Dgcc']
 
         # 从原始配置中提取有用的标志
         defines = self.analysis.get('defines', set())
         includes = self.analysis.get('includes', set())
 
         # 添加所有-D定义
-        for define in sorted(defines):
-            safe_flags += f' -D{define}'
+        parts.extend(f' -D{define}' for define in sorted(defines))
 
-        # 添加所有-I包含路径
-        for include in sorted(includes):
-            # 确保包含路径是有效的
-            if include and include.strip():
-                safe_flags += f' -I{include}'
+        # 添加所有-I包含路径（确保包含路径是有效的）
+        parts.extend(f' -I{include}' for include in sorted(includes) if include and include.strip())
 
         # 尝试从原始配置中提取其他有用的标志
         original_cflags = ''
@@ -513,127 +648,120 @@ class RTConfigGenerator:
 
         if original_cflags:
             # 过滤掉已知不支持的选项
-            filtered_flags = original_cflags
-            for keyword in self.analyzer.unsupported_gcc_keywords:
-                filtered_flags = filtered_flags.replace(keyword, '')
-
-            # 提取有用的通用选项
-            useful_patterns = [
-                r'(-fstack-usage)',
-                r'(-fdump-rtl-\w+)',
-                r'(-std=\w+)',
-            ]
+            filtered_flags = self.analyzer.remove_unsupported(original_cflags)
 
-            for pattern in useful_patterns:
-                match = re.search(pattern, filtered_flags)
+            # 提取有用的通用选项（每种取第一个）
+            for pattern in _USEFUL_FLAG_RES:
+                match = pattern.search(filtered_flags)
                 if match:
-                    safe_flags += ' ' + match.group(1)
+                    parts.append(' ' + match.group(1))
 
-        return safe_flags
+        return ''.join(parts)
 
     def _get_timestamp(self) -> str:
-        """获取当前时间戳"""
-        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        """获取生成器创建时的时间戳"""
+        return self._timestamp
 
 def generate_migration_report(analyzer: RTConfigAnalyzer, analysis: Dict[str, Any],
                              backup_path: str, report_path: str, output_path: str) -> str:
     """生成迁移报告"""
-    report_lines = []
+    buf = io.StringIO()
+    w = buf.write
+    rule = '-' * 40 + '\n'
 
-    report_lines.append('=' * 60)
-    report_lines.append('RT-Thread BSP配置迁移报告')
-    report_lines.append('=' * 60)
-    report_lines.append('')
+    w('=' * 60 + '\n')
+    w('RT-Thread BSP配置迁移报告\n')
+    w('=' * 60 + '\n')
+    w('\n')
 
     # 基本信息
-    report_lines.append('📋 基本信息')
-    report_lines.append('-' * 40)
-    report_lines.append(f'原始文件: {analysis.get("original_file", "N/A")}')
-    report_lines.append(f'架构: {analysis.get("arch", "N/A")}')
-    report_lines.append(f'CPU: {analysis.get("cpu", "N/A")}')
-    report_lines.append(f'原始编译器: {analysis.get("cross_tool", "N/A")}')
-    report_lines.append(f'构建类型: {analysis.get("build", "N/A")}')
-    report_lines.append(f'链接脚本: {analysis.get("linker_script", "未找到，使用默认")}')
-    report_lines.append(f'dist_handle函数: {"找到" if analysis.get("dist_handle_found") else "未找到"}')
-    report_lines.append('')
+    w('📋 基本信息\n')
+    w(rule)
+    w(f'原始文件: {analysis.get("original_file", "N/A")}\n')
+    w(f'架构: {analysis.get("arch", "N/A")}\n')
+    w(f'CPU: {analysis.get("cpu", "N/A")}\n')
+    w(f'原始编译器: {analysis.get("cross_tool", "N/A")}\n')
+    w(f'构建类型: {analysis.get("build", "N/A")}\n')
+    w(f'链接脚本: {analysis.get("linker_script", "未找到，使用默认")}\n')
+    w(f'dist_handle函数: {"找到" if analysis.get("dist_handle_found") else "未找到"}\n')
+    w('\n')
 
     # 宏定义和包含路径
-    report_lines.append('🔧 提取的编译参数')
-    report_lines.append('-' * 40)
+    w('🔧 提取的编译参数\n')
+    w(rule)
     defines = analysis.get('defines', set())
     includes = analysis.get('includes', set())
 
     if defines:
-        report_lines.append('✅ 宏定义 (-D):')
-        for define in sorted(defines):
-            report_lines.append(f'  -D{define}')
+        w('✅ 宏定义 (-D):\n')
+        w('  -D' + '\n  -D'.join(sorted(defines)) + '\n')
     else:
-        report_lines.append('⚠️ 未提取到宏定义')
+        w('⚠️ 未提取到宏定义\n')
 
-    report_lines.append('')
+    w('\n')
 
     if includes:
-        report_lines.append('✅ 头文件路径 (-I):')
-        for include in sorted(includes):
-            report_lines.append(f'  -I{include}')
+        w('✅ 头文件路径 (-I):\n')
+        w('  -I' + '\n  -I'.join(sorted(includes)) + '\n')
     else:
-        report_lines.append('⚠️ 未提取到头文件路径')
+        w('⚠️ 未提取到头文件路径\n')
 
-    report_lines.append('')
+    w('\n')
 
     # 修改内容
-    report_lines.append('🔧 修改内容')
-    report_lines.append('-' * 40)
+    w('🔧 修改内容\n')
+    w(rule)
 
     # Windows路径处理
     exec_path = analysis.get('exec_path', '')
     if exec_path and analyzer.is_windows_path(exec_path):
-        report_lines.append('✓ Windows路径已替换为Linux路径')
-        report_lines.append(f'  原始: {exec_path}')
-        report_lines.append('  新: /usr/bin (可通过RTT_EXEC_PATH环境变量覆盖)')
+        w('✓ Windows路径已替换为Linux路径\n')
+        w(f'  原始: {exec_path}\n')
+        w('  新: /usr/bin (可通过RTT_EXEC_PATH环境变量覆盖)\n')
     else:
-        report_lines.append('✓ 路径配置无需修改')
+        w('✓ 路径配置无需修改\n')
 
-    report_lines.append('✓ 简化了编译器支持，主要保留GCC')
-    report_lines.append('✓ 自动探测链接脚本路径')
-    report_lines.append('')
+    w('✓ 简化了编译器支持，主要保留GCC\n')
+    w('✓ 自动探测链接脚本路径\n')
+    w('\n')
 
     # 不支持的配置
     unsupported = analysis.get('unsupported_configs', [])
     if unsupported:
-        report_lines.append('⚠️ 不支持的编译参数（已移除）')
-        report_lines.append('-' * 40)
+        w('⚠️ 不支持的编译参数（已移除）\n')
+        w(rule)
         for config in unsupported:
-            report_lines.append(f'  {config["flag"]}:')
-            report_lines.append(f'    原因: 包含GCC不支持的选项 "{config["unsupported_keyword"]}"')
-            report_lines.append(f'    原始值: {config["value"][:100]}...')
-            report_lines.append('')
+            w(f'  {config["flag"]}:\n')
+            w(f'    原因: 包含GCC不支持的选项 "{config["unsupported_keyword"]}"\n')
+            w(f'    原始值: {config["value"][:100]}...\n')
+            w('\n')
     else:
-        report_lines.append('✅ 所有编译参数都兼容GCC')
-        report_lines.append('')
+        w('✅ 所有编译参数都兼容GCC\n')
+        w('\n')
 
     # 新文件信息
-    report_lines.append('📁 生成的文件')
-    report_lines.append('-' * 40)
-    report_lines.append(f'输出文件: {output_path}')
-    report_lines.append(f'备份文件: {backup_path}')
-    report_lines.append(f'报告文件: {report_path}')
-    report_lines.append('')
+    w('📁 生成的文件\n')
+    w(rule)
+    w(f'输出文件: {output_path}\n')
+    w(f'备份文件: {backup_path}\n')
+    w(f'报告文件: {report_path}\n')
+    w('\n')
 
     # 使用说明
-    report_lines.append('🚀 使用说明')
-    report_lines.append('-' * 40)
-    report_lines.append('1. 编译测试: scons')
-    report_lines.append('2. 如果编译失败，检查工具链路径:')
-    report_lines.append('   export RTT_EXEC_PATH=/path/to/your/toolchain')
-    report_lines.append('3. 如果链接脚本路径不正确，请手动修改LFLAGS中的-T参数')
-    report_lines.append('4. 恢复原始配置:')
-    report_lines.append(f'   cp {backup_path} {output_path}')
-    report_lines.append('')
+    w('🚀 使用说明\n')
+    w(rule)
+    w('1. 编译测试: scons\n')
+    w('2. 如果编译失败，检查工具链路径:\n')
+    w('   export RTT_EXEC_PATH=/path/to/your/toolchain\n')
+    w('3. 如果链接脚本路径不正确，请手动修改LFLAGS中的-T参数\n')
+    w('4. 恢复原始配置:\n')
+    w(f'   cp {backup_path} {output_path}\n')
+    w('\n')
 
-    report_lines.append('=' * 60)
+    # 最后一行不带换行符
+    w('=' * 60)
 
-    return '\n'.join(report_lines)
+    return buf.getvalue()
 
 def ensure_logs_dir(bsp_dir: Path) -> Path:
     """确保日志目录存在，返回日志目录路径"""
@@ -641,9 +769,55 @@ def ensure_logs_dir(bsp_dir: Path) -> Path:
     logs_dir.mkdir(exist_ok=True)
     return logs_dir
 
-def generate_timestamp() -> str:
+def write_utf8(file_path: Path, content: str):
+    """以UTF-8编码写入文件（二进制模式+较大缓冲区，减少write系统调用）"""
+    with open(file_path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+        f.write(content.encode('utf-8'))
+
+def replace_utf8(file_path: Path, content: str):
+    """
+    以UTF-8编码写入临时文件后原子替换目标文件（保留原文件的属主、权限和扩展属性）
+    替换而非原地截断，与目标文件共享inode的硬链接备份不会被改写
+    """
+    target = file_path.resolve()
+    st = os.stat(target)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f'.{target.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+            f.write(content.encode('utf-8'))
+        # 先改属主（可能清除setuid位），再复制权限、ACL等扩展属性
+        try:
+            os.chown(tmp_path, st.st_uid, st.st_gid)
+        except OSError:
+            pass
+        shutil.copystat(target, tmp_path)
+        # copystat也复制了旧的修改时间，内容已更新，恢复为当前时间
+        os.utime(tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def make_backup(src: Path, dst: Path):
+    """备份文件：优先创建硬链接（不复制数据），跨文件系统等情况下回退为复制"""
+    # Linux上的link()不跟随符号链接，需对实际文件创建硬链接
+    real_src = os.path.realpath(src)
+    try:
+        os.link(real_src, dst)
+    except FileExistsError:
+        # 同一秒内重复运行时备份文件名相同：已是同一文件则无需再备份，
+        # 否则与shutil.copy2一样覆盖旧文件（不能直接copyfile，旧文件可能是同一inode的硬链接）
+        if os.path.samefile(real_src, dst):
+            return
+        os.unlink(dst)
+        make_backup(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+        shutil.copystat(src, dst)
+
+def generate_timestamp(now: Optional[datetime] = None) -> str:
     """生成时间戳字符串"""
-    return datetime.now().strftime('%Y%m%d_%H%M%S')
+    return (now or datetime.now()).strftime('%Y%m%d_%H%M%S')
 
 def confirm_overwrite(file_path: Path) -> bool:
     """确认是否覆盖文件"""
@@ -660,52 +834,16 @@ def confirm_overwrite(file_path: Path) -> bool:
         print("\n操作已取消")
         return False
 
-def main():
-    """主函数"""
-    print("🛠️  RT-Thread BSP配置迁移工具 (稳定版)")
-    print("=" * 50)
-
-    # 解析命令行参数
-    force = False
-    opts, args = getopt.getopt(sys.argv[1:], "fh", ["force", "help"])
-
-    for opt, arg in opts:
-        if opt in ("-f", "--force"):
-            force = True
-        elif opt in ("-h", "--help"):
-            print("用法: python3 convert-rtconfig.py [选项] <rtconfig.py路径>")
-            print("选项:")
-            print("  -f, --force  强制覆盖，无需确认")
-            print("  -h, --help   显示此帮助信息")
-            print("")
-            print("示例:")
-            print("  python3 convert-rtconfig.py rtconfig.py")
-            print("  python3 convert-rtconfig.py --force rtconfig.py")
-            sys.exit(0)
-
-    if len(args) != 1:
-        print("用法: python3 convert-rtconfig.py [选项] <rtconfig.py路径>")
-        print("示例: python3 convert-rtconfig.py rtconfig.py")
-        print("      将生成整洁的migration_logs目录存放所有日志文件")
-        sys.exit(1)
-
-    input_file = Path(args[0])
-    if not input_file.exists():
-        print(f"❌ 文件不存在: {input_file}")
-        sys.exit(1)
-
-    # 确认覆盖
-    if not force and not confirm_overwrite(input_file):
-        print("操作已取消")
-        sys.exit(0)
-
+def _migrate_one(input_file: Path):
+    """迁移单个rtconfig.py：备份、分析、生成新配置并写入报告"""
     # 创建日志目录
     bsp_dir = input_file.parent
     logs_dir = ensure_logs_dir(bsp_dir)
     print(f"📁 日志目录: {logs_dir}")
 
-    # 生成带时间戳的文件名
-    timestamp = generate_timestamp()
+    # 生成带时间戳的文件名（本次运行只取一次当前时间）
+    now = datetime.now()
+    timestamp = generate_timestamp(now)
     file_stem = input_file.stem
     backup_filename = f"{file_stem}.{timestamp}.backup.py"
     report_filename = f"{file_stem}.{timestamp}.migration_report.txt"
@@ -716,7 +854,7 @@ def main():
 
     # 备份原始文件到日志目录
     print(f"📋 备份原始文件到: {backup_file}")
-    shutil.copy2(input_file, backup_file)
+    make_backup(input_file, backup_file)
 
     # 分析原始文件
     print("🔍 分析原始配置...")
@@ -726,13 +864,12 @@ def main():
 
     # 生成新配置
     print("🔄 生成Linux配置...")
-    generator = RTConfigGenerator(analyzer, analysis)
+    generator = RTConfigGenerator(analyzer, analysis, now)
     new_content = generator.generate()
 
     # 写入新文件（覆盖原rtconfig.py）
     output_file = input_file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    replace_utf8(output_file, new_content)
 
     # 生成报告
     print("📊 生成迁移报告...")
@@ -740,34 +877,26 @@ def main():
                                       str(report_file), str(output_file))
 
     # 保存报告到日志目录
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(report)
+    write_utf8(report_file, report)
 
     # 验证生成的文件
     print("\n🧪 验证生成的文件...")
-    try:
-        with open(output_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        print(f"✅ 新配置文件已生成: {output_file} ({len(lines)} 行)")
-
-        # 检查关键配置
-        with open(output_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            if 'PLATFORM = \'gcc\'' in content and 'EXEC_PATH = \'/usr/bin\'' in content:
-                print("✅ 关键配置验证通过")
-            else:
-                print("⚠️  关键配置可能不完整，请检查生成的文件")
+    # 直接检查内存中刚写入的内容，无需重新读取文件
+    line_count = new_content.count('\n') + (not new_content.endswith('\n'))
+    print(f"✅ 新配置文件已生成: {output_file} ({line_count} 行)")
 
-        # 检查dist_handle是否保留
-        if analysis.get('dist_handle_found'):
-            with open(output_file, 'r', encoding='utf-8') as f:
-                if 'def dist_handle' in f.read():
-                    print("✅ dist_handle函数已保留")
-                else:
-                    print("⚠️  dist_handle函数未找到，但应该存在")
+    # 检查关键配置
+    if 'PLATFORM = \'gcc\'' in new_content and 'EXEC_PATH = \'/usr/bin\'' in new_content:
+        print("✅ 关键配置验证通过")
+    else:
+        print("⚠️  关键配置可能不完整，请检查生成的文件")
 
-    except Exception as e:
-        print(f"❌ 验证失败: {e}")
+    # 检查dist_handle是否保留
+    if analysis.get('dist_handle_found'):
+        if 'def dist_handle' in new_content:
+            print("✅ dist_handle函数已保留")
+        else:
+            print("⚠️  dist_handle函数未找到，但应该存在")
 
     print("\n" + "="*50)
     print("🎉 迁移完成！")
@@ -785,5 +914,84 @@ def main():
     print("3. 如需恢复: cp migration_logs/*.backup.py rtconfig.py")
     print("="*50)
 
+def _migrate_one_captured(input_file: Path) -> Tuple[bool, str]:
+    """在子进程中迁移单个文件，收集其输出，避免多个文件的日志交错"""
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        print(f"\n📄 处理文件: {input_file}")
+        try:
+            _migrate_one(input_file)
+        except Exception as e:
+            print(f"❌ 迁移失败: {input_file}: {e}")
+            return False, buf.getvalue()
+    return True, buf.getvalue()
+
+def main():
+    """主函数"""
+    print("🛠️  RT-Thread BSP配置迁移工具 (稳定版)")
+    print("=" * 50)
+
+    # 解析命令行参数
+    force = False
+    jobs = os.cpu_count() or 1
+    opts, args = getopt.getopt(sys.argv[1:], "fhj:", ["force", "help", "jobs="])
+
+    for opt, arg in opts:
+        if opt in ("-f", "--force"):
+            force = True
+        elif opt in ("-j", "--jobs"):
+            if not arg.isdigit() or int(arg) < 1:
+                print(f"❌ 无效的进程数: {arg}")
+                sys.exit(1)
+            jobs = int(arg)
+        elif opt in ("-h", "--help"):
+            print("用法: python3 convert-rtconfig.py [选项] <rtconfig.py路径> [更多路径...]")
+            print("选项:")
+            print("  -f, --force   强制覆盖，无需确认")
+            print("  -j, --jobs N  同时处理多个文件时的进程数（默认为CPU核数）")
+            print("  -h, --help    显示此帮助信息")
+            print("")
+            print("示例:")
+            print("  python3 convert-rtconfig.py rtconfig.py")
+            print("  python3 convert-rtconfig.py --force rtconfig.py")
+            print("  python3 convert-rtconfig.py --force --jobs 4 bsp/*/rtconfig.py")
+            sys.exit(0)
+
+    if not args:
+        print("用法: python3 convert-rtconfig.py [选项] <rtconfig.py路径> [更多路径...]")
+        print("示例: python3 convert-rtconfig.py rtconfig.py")
+        print("      将生成整洁的migration_logs目录存放所有日志文件")
+        sys.exit(1)
+
+    # 去除重复路径，避免多个进程同时写同一个文件
+    unique_files = {}
+    for arg in args:
+        input_file = Path(arg)
+        if not input_file.exists():
+            print(f"❌ 文件不存在: {input_file}")
+            sys.exit(1)
+        unique_files.setdefault(input_file.resolve(), input_file)
+
+    # 确认覆盖（需要交互，只能在主进程中进行）
+    input_files = [f for f in unique_files.values() if force or confirm_overwrite(f)]
+    if not input_files:
+        print("操作已取消")
+        sys.exit(0)
+
+    # 单个文件直接在当前进程中处理
+    if len(input_files) == 1:
+        _migrate_one(input_files[0])
+        return
+
+    # 多个文件并行处理，按输入顺序输出各文件的日志
+    failed = 0
+    with ProcessPoolExecutor(max_workers=min(jobs, len(input_files))) as executor:
+        for ok, output in executor.map(_migrate_one_captured, input_files):
+            sys.stdout.write(output)
+            failed += not ok
+    if failed:
+        print(f"\n❌ {failed}/{len(input_files)} 个文件迁移失败")
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()